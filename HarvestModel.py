@@ -2,12 +2,60 @@ import agentpy as ap
 import numpy as np
 import random
 import matplotlib.pyplot as plt
-from TractorAgent import TractorAgent 
+from TractorAgent import TractorAgent, q_table_filename
+
+# Registro de trayectoria por tractor y paso; action es el índice en get_possible_actions
+TRAJECTORY_DTYPE = np.dtype([
+    ('tractor', np.int32),
+    ('step', np.int32),
+    ('x', np.int32),
+    ('y', np.int32),
+    ('fuel', np.float64),
+    ('load', np.float64),
+    ('action', np.int8),
+    ('reward', np.float64),
+])
+
+
+def auction_assignment(costs, epsilon=None):
+    # Asignación por subasta (Bertsekas): cada fila (tractor) puja por la columna (parcela)
+    # con mayor valor neto. Con costos enteros y epsilon < 1/n el resultado es óptimo.
+    n, m = costs.shape
+    if epsilon is None:
+        epsilon = 1.0 / (n + 1)
+    values = -costs
+    prices = np.zeros(m)
+    owner = np.full(m, -1)
+    assignment = np.full(n, -1)
+    unassigned = list(range(n))
+
+    while unassigned:
+        i = unassigned.pop()
+        net = values[i] - prices
+        j = int(np.argmax(net))
+        best = net[j]
+        if m > 1:
+            net[j] = -np.inf
+            second = net.max()
+        else:
+            second = best
+        prices[j] += best - second + epsilon
+        if owner[j] >= 0:
+            assignment[owner[j]] = -1
+            unassigned.append(owner[j])
+        owner[j] = i
+        assignment[i] = j
+
+    return assignment
 
 # Definir la clase del modelo
 class HarvestModel(ap.Model):
 
     def setup(self):
+        # Mensajes de progreso (desactivar para entrenamiento sin salida)
+        self.verbose = self.p.get('verbose', True)
+        self.training = False
+
         # Set up the grid with a perimeter and a harvestable inner area
         self.grid = ap.Grid(self, [self.p.field_size, self.p.field_size], track_empty=True, track_agents=True)
         
@@ -41,16 +89,21 @@ class HarvestModel(ap.Model):
             perimeter_cells.append((0, y))                # Left column
             perimeter_cells.append((grid_size - 1, y))    # Right column
 
+        self.perimeter_cells = perimeter_cells
+
         # Place tractors randomly on the perimeter
         self.tractors = ap.AgentList(self, self.p.num_tractors, TractorAgent)
+        for i, tractor in enumerate(self.tractors):
+            tractor.load_q_table(q_table_filename(i))
         tractor_positions = random.sample(perimeter_cells, len(self.tractors))
         self.grid.add_agents(self.tractors, positions=tractor_positions)
 
-        for tractor in self.tractors:
-            if tractor in self.grid.positions:
-                print(f"Tractor {tractor} placed at {self.grid.positions[tractor]}")
-            else:
-                print(f"Warning: Tractor {tractor} was not assigned a position.")
+        if self.verbose:
+            for tractor in self.tractors:
+                if tractor in self.grid.positions:
+                    print(f"Tractor {tractor} placed at {self.grid.positions[tractor]}")
+                else:
+                    print(f"Warning: Tractor {tractor} was not assigned a position.")
 
         self.random.seed(self.p.seed)
 
@@ -59,22 +112,157 @@ class HarvestModel(ap.Model):
         self.refuel_station = random.choice(perimeter_cells)
         self.state_grid[self.refuel_station] = 'refuel_station'  # Mark in state grid
 
-        print(f"Refuel station set at: {self.refuel_station}")
+        if self.verbose:
+            print(f"Refuel station set at: {self.refuel_station}")
 
         # Set an unload point on the opposite side of the grid
         self.unload_point = random.choice(perimeter_cells)
         self.state_grid[self.unload_point] = 'unload_point'  # Mark in state grid
 
-        print(f"Unload point set at: {self.unload_point}")
+        if self.verbose:
+            print(f"Unload point set at: {self.unload_point}")
+
+        # Despachador centralizado (opcional): asigna parcelas disjuntas a los tractores
+        self.dispatcher = self.p.get('dispatcher', False)
+        self.planning_interval = self.p.get('planning_interval', 0)
+        if self.dispatcher:
+            self.plan_assignments()
 
     def step(self):
         # Eventos aleatorios (crecimiento y marchitamiento de cultivos)
         # Por ahora inhabilitados los random events, por cambiarse => self.random_events()
+        # Replanear los tractores que terminaron su objetivo o tienen poco combustible y,
+        # si hay un intervalo de planeación, reasignar a todos periódicamente
+        if self.dispatcher:
+            periodic = self.planning_interval > 0 and self.t % self.planning_interval == 0
+            self.plan_assignments(replan_all=periodic)
         # Cada tractor realiza su movimiento
         for tractor in self.tractors:
             tractor.move()
-        # Actualizar los datos recolectados
-        self.record('Parcels left to harvest', len(self.parcels_ready))
+        # Actualizar los datos recolectados (no durante el entrenamiento)
+        if not self.training:
+            self.record('Parcels left to harvest', len(self.parcels_ready))
+
+    def reset_episode(self):
+        # Reinicio rápido: reutiliza la cuadrícula, el arreglo de estados y los tractores
+        self.t = 0
+        self.state_grid[:] = 'empty'
+
+        # Cultivos en el área interior (el perímetro queda vacío)
+        inner = self.state_grid[1:-1, 1:-1]
+        ready = self.nprandom.random(inner.shape) < 0.9
+        inner[ready] = 'ready_to_harvest'
+        self.parcels_ready = [(x + 1, y + 1) for x, y in np.argwhere(ready).tolist()]
+
+        # Nuevas posiciones de tractores, estación de recarga y punto de descarga
+        tractor_positions = random.sample(self.perimeter_cells, len(self.tractors))
+        for tractor, pos in zip(self.tractors, tractor_positions):
+            self.grid.move_to(tractor, pos)
+            tractor.reset()
+
+        self.refuel_station = random.choice(self.perimeter_cells)
+        self.state_grid[self.refuel_station] = 'refuel_station'
+        self.unload_point = random.choice(self.perimeter_cells)
+        self.state_grid[self.unload_point] = 'unload_point'
+
+        if self.dispatcher:
+            self.plan_assignments()
+
+    def train(self, episodes, steps=None, checkpoint_every=100):
+        # Entrenamiento sin salida: episodios consecutivos sobre el mismo modelo, sin
+        # registrar datos, graficar ni escribir a disco salvo los checkpoints de las tablas Q
+        if steps is None:
+            steps = self.p.steps
+        if not self._partly_run:
+            self.sim_setup(steps=steps)
+        elif self.t > 0:
+            # El modelo ya avanzó (por run() o un entrenamiento previo): empezar de cero
+            self.reset_episode()
+        self.training = True
+
+        harvested = []
+        for episode in range(episodes):
+            if episode > 0:
+                self.reset_episode()
+            for _ in range(steps):
+                if not self.parcels_ready:
+                    break
+                self.t += 1
+                self.step()
+            harvested.append(int(np.sum(self.state_grid == 'harvested')))
+
+            if checkpoint_every and (episode + 1) % checkpoint_every == 0:
+                self.save_q_tables()
+
+        # Guardar al final salvo que el último episodio ya haya hecho checkpoint
+        if not (checkpoint_every and episodes % checkpoint_every == 0):
+            self.save_q_tables()
+        self.training = False
+        return harvested
+
+    def needs_plan(self, tractor):
+        # Un tractor necesita una nueva asignación si no tiene objetivo, si su objetivo
+        # ya no está listo para cosechar o si su combustible está bajo
+        if tractor.target is None:
+            return True
+        if self.state_grid[tractor.target] != 'ready_to_harvest':
+            return True
+        return tractor.fuel_level <= self.p.fuel_threshold
+
+    def plan_assignments(self, replan_all=False):
+        # Liberar los objetivos de los tractores que deben replanearse
+        to_plan = []
+        for tractor in self.tractors:
+            if replan_all or self.needs_plan(tractor):
+                tractor.target = None
+                if (tractor in self.grid.positions and
+                        tractor.fuel_level > self.p.fuel_threshold and
+                        tractor.load < tractor.capacity):
+                    to_plan.append(tractor)
+        if not to_plan:
+            return
+
+        # Parcelas disponibles: listas y no reservadas por otro tractor
+        reserved = {tractor.target for tractor in self.tractors if tractor.target is not None}
+        available = [p for p in self.parcels_ready if p not in reserved]
+        if not available:
+            return
+        parcels = np.array(available)
+
+        positions = np.array([self.grid.positions[tractor] for tractor in to_plan])
+        distances = np.abs(positions[:, None, :] - parcels[None, :, :]).sum(axis=2)
+
+        # Costo: distancia a la parcela más el regreso al punto de descarga si con ella se llena
+        to_refuel = np.abs(parcels - np.array(self.refuel_station)).sum(axis=1)
+        to_unload = np.abs(parcels - np.array(self.unload_point)).sum(axis=1)
+        loads = np.array([tractor.load for tractor in to_plan])
+        fills_up = (loads + self.p.harvest_amount >= self.p.capacity)[:, None]
+        costs = distances + fills_up * to_unload[None, :]
+
+        # Descartar parcelas desde las que el tractor no alcanzaría la estación de recarga
+        fuel = np.array([tractor.fuel_level - self.p.fuel_threshold for tractor in to_plan])
+        reach = fuel[:, None] / self.p.fuel_consumption_rate
+        infeasible = distances + to_refuel[None, :] > reach
+        big = int(costs.max()) + 4 * self.p.field_size + 1
+        costs = np.where(infeasible, big, costs)
+
+        # Con n tractores, cada uno recibe una de sus n parcelas de menor costo en la
+        # asignación óptima, así que basta con la unión de esas columnas
+        n = len(to_plan)
+        if parcels.shape[0] > n:
+            cheapest = np.argpartition(costs, n - 1, axis=1)[:, :n]
+            candidates = np.unique(cheapest)
+            parcels = parcels[candidates]
+            costs = costs[:, candidates]
+            infeasible = infeasible[:, candidates]
+
+        # Columnas ficticias para los tractores que se quedan sin parcela
+        costs = np.hstack([costs, np.full((n, n), big)])
+
+        assignment = auction_assignment(costs)
+        for i, (tractor, j) in enumerate(zip(to_plan, assignment)):
+            if j < parcels.shape[0] and not infeasible[i, j]:
+                tractor.target = tuple(int(c) for c in parcels[j])
 
     def random_events(self):
         # Simular eventos aleatorios que afectan al campo
@@ -116,6 +304,15 @@ class HarvestModel(ap.Model):
             # Optionally, close the figure to free up memory if running many tractors
             plt.close(fig)
     
+    def export_trajectories(self, filename="trajectories.npy"):
+        # Exportar las trayectorias de todos los tractores a un .npy con un registro por
+        # tractor y paso (TRAJECTORY_DTYPE), agrupado por tractor y en orden de paso. Se
+        # puede abrir con np.load(filename, mmap_mode='r') y cada campo es una vista
+        rows = [(tractor.id,) + point for tractor in self.tractors for point in tractor.trajectory]
+        np.save(filename, np.array(rows, dtype=TRAJECTORY_DTYPE))
+        if self.verbose:
+            print(f"Saved trajectories as {filename}")
+
     def save_q_tables(self):
         for tractor in self.tractors:
             tractor.save_q_table()
@@ -124,6 +321,9 @@ class HarvestModel(ap.Model):
     def end(self):
         # Al final de la simulación
         # After running the simulation, plot data
-        self.plot_tractor_data()
+        if self.p.get('plot', True):
+            self.plot_tractor_data()
+        if self.p.get('trajectory_file'):
+            self.export_trajectories(self.p.trajectory_file)
         total_harvested = np.sum(self.state_grid == 'harvested')
         self.report('Total parcels harvested', total_harvested)
@@ -7,6 +7,13 @@ from collections import defaultdict
 import os
 import pickle
 
+
+def q_table_filename(index):
+    # Archivo de la tabla Q del tractor en la posición index (desde 0) del modelo;
+    # lo usan HarvestModel y VectorHarvestEnv para leer y escribir las mismas tablas
+    return f'q_table_{index + 1}.pkl'
+
+
 # Definir la clase del agente Tractor
 class TractorAgent(ap.Agent):
 
@@ -24,46 +31,66 @@ class TractorAgent(ap.Agent):
         # Agregar más si es necesario para graficar
         self.fuel_levels = []
         self.loads = []
+        # Trayectoria por paso: (paso, x, y, combustible, carga, acción, recompensa)
+        self.trajectory = []
 
-        # Q learning
-        q_table_filename = f'q_table_{self.id}.pkl'
-        if os.path.exists(q_table_filename):
-            with open(q_table_filename, 'rb') as f:
-                self.q_table = defaultdict(float, pickle.load(f))
-            print(f"Tractor {self.id}: Tabla Q cargada desde {q_table_filename}")
-        else:
-            self.q_table = defaultdict(float)
-            print(f"Tractor {self.id}: No se encontró una tabla Q previa, iniciando nueva tabla")
+        # Q learning (la tabla se carga con load_q_table desde HarvestModel.setup)
+        self.q_table = defaultdict(float)
+        self.q_table_filename = None
 
         self.alpha = 0.1  # Tasa de aprendizaje
         self.gamma = 0.9  # Factor de descuento
         self.epsilon = 0.1  # Probabilidad para la política epsilon-greedy
         self.last_state = None
         self.last_action = None
+
+        # Objetivo asignado por el despachador del modelo (si está activo)
+        self.target = None
+
+    def reset(self):
+        # Reiniciar el estado del episodio conservando la tabla Q
+        self.load = 0
+        self.fuel_level = self.p.max_fuel
+        self.broken_down = False
+        self.repair_time = 0
+        self.fuel_levels.clear()
+        self.loads.clear()
+        self.trajectory.clear()
+        self.last_state = None
+        self.last_action = None
+        self.target = None
     
     def move(self):
         # Guardar los niveles actuales de combustible y carga para graficar
-        self.fuel_levels.append(self.fuel_level)
-        self.loads.append(self.load)
+        if not self.model.training:
+            self.fuel_levels.append(self.fuel_level)
+            self.loads.append(self.load)
 
         # Obtener el estado actual
         state = self.get_state()
         if state is None:
             return
 
-        # Política epsilon-greedy
-        if random.random() < self.epsilon:
-            action = random.choice(self.get_possible_actions())
-        else:
-            q_values = [self.q_table[(state, a)] for a in self.get_possible_actions()]
-            max_q = max(q_values)
-            # Puede haber múltiples acciones con el mismo valor Q
-            actions_with_max_q = [a for a, q in zip(self.get_possible_actions(), q_values) if q == max_q]
-            action = random.choice(actions_with_max_q)
+        # Con despachador se sigue el objetivo asignado; si no hay, política epsilon-greedy
+        action = self.dispatched_action() if self.model.dispatcher else None
+        if action is None:
+            if random.random() < self.epsilon:
+                action = random.choice(self.get_possible_actions())
+            else:
+                q_values = [self.q_table[(state, a)] for a in self.get_possible_actions()]
+                max_q = max(q_values)
+                # Puede haber múltiples acciones con el mismo valor Q
+                actions_with_max_q = [a for a, q in zip(self.get_possible_actions(), q_values) if q == max_q]
+                action = random.choice(actions_with_max_q)
 
         # Ejecutar la acción y obtener la recompensa y el nuevo estado
         reward, next_state = self.take_action(action)
 
+        if not self.model.training:
+            x, y = self.grid.positions[self]
+            self.trajectory.append((self.model.t, x, y, self.fuel_level, self.load,
+                                    self.get_possible_actions().index(action), reward))
+
         # Actualizar la tabla Q
         if self.last_state is not None and self.last_action is not None:
             old_value = self.q_table[(self.last_state, self.last_action)]
@@ -75,6 +102,56 @@ class TractorAgent(ap.Agent):
         self.last_state = state
         self.last_action = action
     
+    def dispatched_action(self):
+        # Elegir la acción que acerca al tractor al objetivo asignado por el despachador
+        current_pos = self.grid.positions.get(self, None)
+        if current_pos is None:
+            return None
+
+        if self.fuel_level <= self.p.fuel_threshold:
+            goal, action = self.model.refuel_station, 'refuel'
+        elif self.load >= self.capacity:
+            goal, action = self.model.unload_point, 'unload'
+        elif self.target is not None and self.model.state_grid[self.target] == 'ready_to_harvest':
+            goal, action = self.target, 'harvest'
+        elif self.load > 0:
+            goal, action = self.model.unload_point, 'unload'
+        elif self.model.parcels_ready and self.fuel_level < self.p.max_fuel:
+            # Sin objetivo alcanzable con el combustible actual: recargar primero
+            goal, action = self.model.refuel_station, 'refuel'
+        else:
+            return None
+
+        if current_pos == goal:
+            return action
+        return self.step_towards(current_pos, goal)
+
+    def step_towards(self, current_pos, goal):
+        # Movimiento que reduce la distancia Manhattan, evitando celdas ocupadas si es posible
+        occupied = set(self.grid.positions.values())
+        moves = []
+        if goal[0] < current_pos[0]:
+            moves.append(('move_up', (current_pos[0] - 1, current_pos[1])))
+        if goal[0] > current_pos[0]:
+            moves.append(('move_down', (current_pos[0] + 1, current_pos[1])))
+        if goal[1] < current_pos[1]:
+            moves.append(('move_left', (current_pos[0], current_pos[1] - 1)))
+        if goal[1] > current_pos[1]:
+            moves.append(('move_right', (current_pos[0], current_pos[1] + 1)))
+        for action, next_pos in moves:
+            if next_pos not in occupied:
+                return action
+        # Si el camino está bloqueado, rodear por una celda libre cualquiera
+        detours = [('move_up', (-1, 0)), ('move_down', (1, 0)), ('move_left', (0, -1)), ('move_right', (0, 1))]
+        random.shuffle(detours)
+        for action, (dx, dy) in detours:
+            next_pos = (current_pos[0] + dx, current_pos[1] + dy)
+            if (0 <= next_pos[0] < self.grid.shape[0] and
+                0 <= next_pos[1] < self.grid.shape[1] and
+                next_pos not in occupied):
+                return action
+        return moves[0][0]
+
     def attempt_move(self, next_pos):
         if (0 <= next_pos[0] < self.grid.shape[0] and
             0 <= next_pos[1] < self.grid.shape[1]):
@@ -257,8 +334,20 @@ class TractorAgent(ap.Agent):
         actions = ['move_up', 'move_down', 'move_left', 'move_right', 'harvest', 'unload', 'refuel']
         return actions
     
+    def load_q_table(self, filename):
+        # Cargar la tabla Q previa si existe; se guardará en el mismo archivo
+        self.q_table_filename = filename
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                self.q_table = defaultdict(float, pickle.load(f))
+            if self.p.get('verbose', True):
+                print(f"Tractor {self.id}: Tabla Q cargada desde {filename}")
+        else:
+            self.q_table = defaultdict(float)
+            if self.p.get('verbose', True):
+                print(f"Tractor {self.id}: No se encontró una tabla Q previa, iniciando nueva tabla")
+
     def save_q_table(self):
-        q_table_filename = f'q_table_{self.id}.pkl'
-        with open(q_table_filename, 'wb') as f:
+        with open(self.q_table_filename, 'wb') as f:
             pickle.dump(dict(self.q_table), f)
 
@@ -0,0 +1,287 @@
+import numpy as np
+import os
+import pickle
+from TractorAgent import q_table_filename
+
+# Acciones en el mismo orden que TractorAgent.get_possible_actions
+ACTIONS = ['move_up', 'move_down', 'move_left', 'move_right', 'harvest', 'unload', 'refuel']
+MOVES = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])
+HARVEST, UNLOAD, REFUEL = 4, 5, 6
+
+# Estados de las celdas del campo
+EMPTY, READY, HARVESTED = 0, 1, 2
+
+# Estado discreto de TractorAgent.get_state codificado como entero:
+# combustible (2) x carga (2) x cultivos vecinos (3^4) x tractores vecinos (2^4)
+NUM_STATES = 2 * 2 * 81 * 16
+
+
+def decode_state(index):
+    # Convertir el índice entero en la tupla de estado que usa TractorAgent
+    index, tractors_code = divmod(int(index), 16)
+    index, crops_code = divmod(index, 81)
+    fuel_code, load_code = divmod(index, 2)
+    crops = tuple((crops_code // 3 ** (3 - i)) % 3 - 1 for i in range(4))
+    tractors = tuple((tractors_code >> (3 - i)) & 1 for i in range(4))
+    fuel_level = 'High' if fuel_code == 0 else 'Low'
+    load_level = 'Full' if load_code == 0 else 'NotFull'
+    return (fuel_level, load_level, crops, tractors)
+
+
+def encode_state(state):
+    # Inverso de decode_state
+    fuel_level, load_level, crops, tractors = state
+    index = (0 if fuel_level == 'High' else 1) * 2 + (0 if load_level == 'Full' else 1)
+    crops_code = 0
+    for c in crops:
+        crops_code = crops_code * 3 + c + 1
+    tractors_code = 0
+    for t in tractors:
+        tractors_code = tractors_code * 2 + t
+    return (index * 81 + crops_code) * 16 + tractors_code
+
+
+class VectorHarvestEnv:
+    # K campos independientes avanzados en una sola llamada por paso. Reproduce la dinámica
+    # de HarvestModel/TractorAgent (que sigue siendo la implementación de referencia) con
+    # arreglos apilados; los tractores de cada campo actúan en orden, como en el modelo.
+    # El despachador y los eventos aleatorios no están soportados.
+
+    def __init__(self, parameters, num_envs, shared_q=True, seed=None):
+        self.p = parameters
+        self.num_envs = num_envs
+        self.num_tractors = parameters['num_tractors']
+        self.size = parameters['field_size']
+        self.steps = parameters['steps']
+        self.rng = np.random.default_rng(seed if seed is not None else parameters.get('seed'))
+
+        self.alpha = 0.1  # Tasa de aprendizaje
+        self.gamma = 0.9  # Factor de descuento
+        self.epsilon = 0.1  # Probabilidad para la política epsilon-greedy
+
+        # Celdas del perímetro (mismo orden que HarvestModel.setup)
+        n = self.size
+        perimeter = []
+        for x in range(n):
+            perimeter.append((x, 0))
+            perimeter.append((x, n - 1))
+        for y in range(1, n - 1):
+            perimeter.append((0, y))
+            perimeter.append((n - 1, y))
+        self.perimeter_cells = np.array(perimeter)
+
+        # Estado apilado de todos los campos
+        K, T = num_envs, self.num_tractors
+        self.field = np.zeros((K, n, n), dtype=np.int8)
+        self.parcels_left = np.zeros(K, dtype=np.int64)
+        self.positions = np.zeros((K, T, 2), dtype=np.int64)
+        self.fuel = np.zeros((K, T))
+        self.load = np.zeros((K, T))
+        self.refuel_station = np.zeros((K, 2), dtype=np.int64)
+        self.unload_point = np.zeros((K, 2), dtype=np.int64)
+        self.t = np.zeros(K, dtype=np.int64)
+        self.last_state = np.full((K, T), -1)
+        self.last_action = np.full((K, T), -1)
+
+        # Una tabla Q compartida o una por campo y tractor
+        self.shared_q = shared_q
+        if shared_q:
+            self.q_tables = np.zeros((1, NUM_STATES, len(ACTIONS)))
+            self.table_index = np.zeros((K, T), dtype=np.int64)
+        else:
+            self.q_tables = np.zeros((K * T, NUM_STATES, len(ACTIONS)))
+            self.table_index = np.arange(K * T).reshape(K, T)
+
+        self.episode_harvested = []
+        self.reset(np.ones(K, dtype=bool))
+
+    def reset(self, mask):
+        # Reiniciar los campos indicados por la máscara booleana
+        envs = np.flatnonzero(mask)
+        if envs.size == 0:
+            return
+        n = self.size
+
+        ready = self.rng.random((envs.size, n - 2, n - 2)) < 0.9
+        self.field[envs] = EMPTY
+        self.field[envs, 1:-1, 1:-1] = np.where(ready, READY, EMPTY)
+        self.parcels_left[envs] = ready.sum(axis=(1, 2))
+
+        # Tractores en celdas distintas del perímetro
+        picks = np.argsort(self.rng.random((envs.size, len(self.perimeter_cells))), axis=1)
+        self.positions[envs] = self.perimeter_cells[picks[:, :self.num_tractors]]
+        self.refuel_station[envs] = self.perimeter_cells[self.rng.integers(len(self.perimeter_cells), size=envs.size)]
+        self.unload_point[envs] = self.perimeter_cells[self.rng.integers(len(self.perimeter_cells), size=envs.size)]
+
+        self.fuel[envs] = self.p['max_fuel']
+        self.load[envs] = 0
+        self.t[envs] = 0
+        self.last_state[envs] = -1
+        self.last_action[envs] = -1
+
+    def get_states(self, j):
+        # Estado codificado del tractor j en todos los campos, forma (K,)
+        K = self.num_envs
+        envs = np.arange(K)
+        neighbors = self.positions[:, j, None, :] + MOVES[None, :, :]  # (K, 4, 2)
+        inside = ((neighbors >= 0) & (neighbors < self.size)).all(axis=2)
+        nx = np.clip(neighbors[..., 0], 0, self.size - 1)
+        ny = np.clip(neighbors[..., 1], 0, self.size - 1)
+        crops = np.where(inside, (self.field[envs[:, None], nx, ny] == READY).astype(np.int64), -1)
+        tractors = (neighbors[:, :, None, :] == self.positions[:, None, :, :]).all(axis=3).any(axis=2)
+
+        fuel_code = (self.fuel[:, j] <= self.p['max_fuel'] * 0.5).astype(np.int64)
+        load_code = (self.load[:, j] < self.p['capacity']).astype(np.int64)
+        crops_code = ((crops + 1) * np.array([27, 9, 3, 1])).sum(axis=1)
+        tractors_code = (tractors * np.array([8, 4, 2, 1])).sum(axis=1)
+        return ((fuel_code * 2 + load_code) * 81 + crops_code) * 16 + tractors_code
+
+    def choose_actions(self, tables, states):
+        # Política epsilon-greedy con desempate aleatorio entre acciones de igual valor Q
+        q = self.q_tables[tables, states]
+        best = q == q.max(axis=1, keepdims=True)
+        greedy = np.argmax(best * self.rng.random(q.shape), axis=1)
+        explore = self.rng.random(len(states)) < self.epsilon
+        return np.where(explore, self.rng.integers(len(ACTIONS), size=len(states)), greedy)
+
+    def take_actions(self, j, actions):
+        # Ejecutar la acción del tractor j en todos los campos y devolver las recompensas
+        K = self.num_envs
+        envs = np.arange(K)
+        pos = self.positions[:, j].copy()
+        rewards = np.full(K, -1.0)  # Penalización por tiempo
+
+        is_move = actions < 4
+        next_pos = pos + MOVES[np.minimum(actions, 3)]
+        inside = ((next_pos >= 0) & (next_pos < self.size)).all(axis=1)
+        occupied = (next_pos[:, None, :] == self.positions).all(axis=2).any(axis=1)
+        moved = is_move & inside & ~occupied
+        rewards[is_move & ~inside] -= 10
+        rewards[is_move & inside & occupied] -= 100
+        self.positions[moved, j] = next_pos[moved]
+        self.fuel[moved, j] -= self.p['fuel_consumption_rate']
+
+        ready = self.field[envs, pos[:, 0], pos[:, 1]] == READY
+        harvested = (actions == HARVEST) & ready
+        self.field[envs[harvested], pos[harvested, 0], pos[harvested, 1]] = HARVESTED
+        self.load[harvested, j] += self.p['harvest_amount']
+        self.parcels_left[harvested] -= 1
+        rewards[actions == HARVEST] += np.where(ready, 10, -5)[actions == HARVEST]
+
+        at_unload = (pos == self.unload_point).all(axis=1)
+        unloaded = (actions == UNLOAD) & at_unload & (self.load[:, j] > 0)
+        self.load[unloaded, j] = 0
+        rewards[actions == UNLOAD] += np.where(unloaded, 5, -5)[actions == UNLOAD]
+
+        at_refuel = (pos == self.refuel_station).all(axis=1)
+        refueled = (actions == REFUEL) & at_refuel
+        self.fuel[refueled, j] = self.p['max_fuel']
+        rewards[actions == REFUEL] += np.where(refueled, 5, -5)[actions == REFUEL]
+
+        return rewards
+
+    def step(self):
+        # Avanzar un paso en todos los campos; los campos terminados se reinician solos
+        K = self.num_envs
+        rewards = np.zeros((K, self.num_tractors))
+        self.t += 1
+
+        for j in range(self.num_tractors):
+            tables = self.table_index[:, j]
+            states = self.get_states(j)
+            actions = self.choose_actions(tables, states)
+            rewards[:, j] = self.take_actions(j, actions)
+            next_states = self.get_states(j)
+
+            # Actualización Q igual que en TractorAgent.move
+            learn = self.last_state[:, j] >= 0
+            if learn.any():
+                t_idx = tables[learn]
+                s_idx = self.last_state[learn, j]
+                a_idx = self.last_action[learn, j]
+                old_value = self.q_tables[t_idx, s_idx, a_idx]
+                next_max = self.q_tables[t_idx, next_states[learn]].max(axis=1)
+                delta = self.alpha * (rewards[learn, j] + self.gamma * next_max - old_value)
+
+                # Con tabla compartida varios campos pueden actualizar el mismo (tabla, s, a);
+                # todos parten del mismo valor, así que se aplica el promedio y no la suma
+                flat = np.ravel_multi_index((t_idx, s_idx, a_idx), self.q_tables.shape)
+                unique, inverse = np.unique(flat, return_inverse=True)
+                mean_delta = np.bincount(inverse, weights=delta) / np.bincount(inverse)
+                self.q_tables.reshape(-1)[unique] += mean_delta
+
+            self.last_state[:, j] = states
+            self.last_action[:, j] = actions
+
+        done = (self.t >= self.steps) | (self.parcels_left == 0)
+        if done.any():
+            harvested = (self.field[done] == HARVESTED).sum(axis=(1, 2))
+            self.episode_harvested.extend(harvested.tolist())
+            self.reset(done)
+        return rewards, done
+
+    def to_q_dict(self, table=0):
+        # Exportar una tabla Q al formato de diccionario de TractorAgent
+        q_table = {}
+        for s, a in zip(*np.nonzero(self.q_tables[table])):
+            q_table[(decode_state(s), ACTIONS[a])] = float(self.q_tables[table, s, a])
+        return q_table
+
+    def load_q_dict(self, q_table, table=0):
+        # Importar una tabla Q guardada por TractorAgent
+        for (state, action), value in q_table.items():
+            self.q_tables[table, encode_state(state), ACTIONS.index(action)] = value
+
+    def load_q_tables(self):
+        # Continuar desde las tablas guardadas por HarvestModel o por una ejecución anterior.
+        # Con tabla compartida se promedian las de todos los tractores; si no, la del
+        # tractor j se copia a su tabla en cada campo
+        loaded = []
+        for j in range(self.num_tractors):
+            filename = q_table_filename(j)
+            if not os.path.exists(filename):
+                continue
+            with open(filename, 'rb') as f:
+                q_table = pickle.load(f)
+            if self.shared_q:
+                self.q_tables[0] = 0
+                self.load_q_dict(q_table, 0)
+                loaded.append(self.q_tables[0].copy())
+            else:
+                self.load_q_dict(q_table, self.table_index[0, j])
+                self.q_tables[self.table_index[:, j]] = self.q_tables[self.table_index[0, j]]
+        if self.shared_q:
+            self.q_tables[0] = np.mean(loaded, axis=0) if loaded else 0
+
+    def save_q_tables(self, env=0):
+        # Guardar la tabla Q de cada tractor del campo env donde TractorAgent la carga
+        self.check_q_tables()
+        for j in range(self.num_tractors):
+            with open(q_table_filename(j), 'wb') as f:
+                pickle.dump(self.to_q_dict(self.table_index[env, j]), f)
+
+    def check_q_tables(self):
+        # Los valores Q deben ser finitos y no superar max|recompensa| / (1 - gamma); la
+        # peor recompensa es -101 (tiempo más colisión)
+        bound = 101 / (1 - self.gamma)
+        if not np.all(np.isfinite(self.q_tables)) or np.abs(self.q_tables).max() > bound:
+            raise FloatingPointError("Q-table values diverged")
+
+    def train(self, episodes, checkpoint_every=100):
+        # Avanzar todos los campos hasta completar episodes episodios, guardando las tablas
+        # Q cada checkpoint_every episodios y al final
+        start = len(self.episode_harvested)
+        next_checkpoint = checkpoint_every
+        saved = False
+        while len(self.episode_harvested) - start < episodes:
+            self.step()
+            saved = False
+            completed = len(self.episode_harvested) - start
+            if checkpoint_every and completed >= next_checkpoint:
+                self.save_q_tables()
+                saved = True
+                while next_checkpoint <= completed:
+                    next_checkpoint += checkpoint_every
+        if not saved:
+            self.save_q_tables()
+        return self.episode_harvested[start:start + episodes]
@@ -1,12 +1,80 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import matplotlib.pyplot as plt
+import numpy as np
+import base64
+import io
+import json
 import os
+import queue
+import sys
+import threading
+import time
 import uuid
 import matplotlib
 matplotlib.use("Agg")  # Non-interactive backend
 
+# The simulation lives in the repository root, one level above the API
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from HarvestModel import HarvestModel
+from default_parameters import DEFAULT_PARAMETERS
+
 app = Flask(__name__)
 
+# Default parameters for live runs (same as simulation.py, without logs or plots)
+LIVE_PARAMETERS = dict(DEFAULT_PARAMETERS, verbose=False, plot=False)
+
+# Same cell codes as plot_field in simulation.py
+STATE_TO_INT = {
+    'empty': 0,
+    'ready_to_harvest': 1,
+    'harvested': 2,
+    'refuel_station': 3,
+    'unload_point': 4
+}
+
+# Live simulations by id; finished runs are dropped after FINISHED_TTL seconds
+simulations = {}
+simulations_lock = threading.Lock()
+FINISHED_TTL = 60
+MAX_RUNNING_SIMULATIONS = 4
+
+# Allowed range of the numeric parameters of a live run (inclusive)
+PARAMETER_LIMITS = {
+    'field_size': (3, 500),
+    'num_tractors': (1, 50),
+    'capacity': (1, 10000),
+    'max_fuel': (1, 100000),
+    'fuel_consumption_rate': (0.001, 1000),
+    'steps': (1, 10000),
+}
+
+
+def validate_parameters(overrides):
+    # Returns an error message, or None if the overrides are valid. Only keys of
+    # DEFAULT_PARAMETERS are accepted, with the same type as their default
+    for key, value in overrides.items():
+        if key not in DEFAULT_PARAMETERS:
+            return f"Unknown parameter '{key}'"
+        default = DEFAULT_PARAMETERS[key]
+        if isinstance(default, bool):
+            valid = isinstance(value, bool)
+        elif isinstance(default, int):
+            valid = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if not valid:
+            return f"Parameter '{key}' must be of type {type(default).__name__}"
+        if not isinstance(value, bool):
+            low, high = PARAMETER_LIMITS.get(key, (0, float('inf')))
+            if not low <= value <= high:
+                return f"Parameter '{key}' must be between {low} and {high}"
+
+    # Tractors start on distinct perimeter cells
+    parameters = dict(DEFAULT_PARAMETERS, **overrides)
+    if parameters['num_tractors'] > 4 * (parameters['field_size'] - 1):
+        return "Parameter 'num_tractors' exceeds the perimeter cells of the field"
+    return None
+
 @app.route('/upload-tractor-data', methods=['POST'])
 def upload_tractor_data():
     try:
@@ -51,6 +119,247 @@ def upload_tractor_data():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/upload-tractor-trajectories', methods=['POST'])
+def upload_tractor_trajectories():
+    try:
+        # Accept the .npy exported by HarvestModel.export_trajectories, either as
+        # a multipart file named "file" or as the raw request body
+        upload = request.files.get("file")
+        raw = upload.read() if upload is not None else request.get_data()
+        if not raw:
+            return jsonify({"error": "No trajectory file was sent"}), 400
+
+        try:
+            records = read_trajectory_records(raw)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid trajectory file: {e}"}), 400
+
+        required = {"tractor", "step", "x", "y", "fuel"}
+        missing = required - set(records.dtype.names or ())
+        if missing:
+            return jsonify({"error": f"The file is missing columns: {sorted(missing)}"}), 400
+        columns = {name: records[name] for name in required}
+
+        tractor_names, speeds_data, fuel_data, position_data = trajectory_series(columns)
+
+        # Generate unique ID for the file
+        unique_id = str(uuid.uuid4())
+
+        # Create and save combined graphs
+        save_combined_graphs(tractor_names, speeds_data, fuel_data, position_data, unique_id)
+
+        return jsonify({"status": "Combined plots generated successfully"}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def read_trajectory_records(raw):
+    # Parse only the .npy header and view the uploaded bytes as the record array,
+    # so the columns are read without copying the data
+    stream = io.BytesIO(raw)
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    else:
+        raise ValueError(f"unsupported .npy version {version}")
+    if dtype.hasobject or dtype.names is None or len(shape) != 1:
+        raise ValueError("expected a one-dimensional record array")
+    return np.frombuffer(raw, dtype=dtype, count=shape[0], offset=stream.tell())
+
+
+def trajectory_series(columns):
+    # Split the columns per tractor and derive speed and cumulative fuel used,
+    # without building per-point dicts. export_trajectories already writes the rows
+    # grouped by tractor and step, so the splits are views of the loaded arrays;
+    # other row orders are sorted first (which copies the columns)
+    tractor, step = columns["tractor"], columns["step"]
+    same_tractor = np.diff(tractor) == 0
+    if not (np.all(np.diff(tractor) >= 0) and np.all(np.diff(step)[same_tractor] >= 0)):
+        order = np.lexsort((step, tractor))
+        columns = {name: values[order] for name, values in columns.items()}
+        tractor = columns["tractor"]
+
+    ids, starts = np.unique(tractor, return_index=True)
+    bounds = list(starts[1:])
+
+    steps = np.split(columns["step"], bounds)
+    xs = np.split(columns["x"], bounds)
+    ys = np.split(columns["y"], bounds)
+    fuels = np.split(columns["fuel"], bounds)
+
+    tractor_names = [f"Tractor {i}" for i in ids]
+    speeds_data = []
+    fuel_data = []
+    position_data = []
+    for step, x, y, fuel in zip(steps, xs, ys, fuels):
+        # Cells moved per step; fuel used only counts decreases (refuels are ignored)
+        dt = np.maximum(np.diff(step, prepend=step[:1]), 1)
+        speed = np.hypot(np.diff(x, prepend=x[:1]), np.diff(y, prepend=y[:1])) / dt
+        fuel_used = np.cumsum(np.maximum(-np.diff(fuel, prepend=fuel[:1]), 0))
+        speeds_data.append((step, speed))
+        fuel_data.append((step, fuel_used))
+        position_data.append((x, y))
+
+    return tractor_names, speeds_data, fuel_data, position_data
+
+
+class LiveSimulation:
+    # Runs a HarvestModel in a background thread and publishes one delta per step
+    # (changed cells and tractor positions) to every subscribed client
+
+    def __init__(self, simulation_id, parameters, steps_per_second):
+        self.id = simulation_id
+        self.model = HarvestModel(parameters)
+        self.interval = 1.0 / steps_per_second if steps_per_second > 0 else 0
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.finished = False
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        with self.lock:
+            self.model.sim_setup()
+            self.previous = self.model.state_grid.copy()
+        self.thread.start()
+
+    def tractor_positions(self):
+        positions = self.model.grid.positions
+        return [[tractor.id, int(positions[tractor][0]), int(positions[tractor][1])]
+                for tractor in self.model.tractors if tractor in positions]
+
+    def keyframe(self):
+        field = np.vectorize(STATE_TO_INT.get, otypes=[np.uint8])(self.model.state_grid)
+        return {
+            "step": self.model.t,
+            "shape": list(field.shape),
+            "field": base64.b64encode(field.tobytes()).decode("ascii"),
+            "legend": STATE_TO_INT,
+            "tractors": self.tractor_positions()
+        }
+
+    def subscribe(self):
+        # The keyframe is taken under the lock so no delta is lost or repeated
+        events = queue.Queue()
+        with self.lock:
+            events.put(("keyframe", self.keyframe()))
+            if self.finished:
+                if self.error is not None:
+                    events.put(("error", {"error": self.error}))
+                events.put(("end", {"step": self.model.t}))
+            else:
+                self.subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events):
+        with self.lock:
+            if events in self.subscribers:
+                self.subscribers.remove(events)
+
+    def publish(self, event, data):
+        for events in self.subscribers:
+            events.put((event, data))
+
+    def run(self):
+        try:
+            while True:
+                with self.lock:
+                    if not self.model.running:
+                        break
+                    self.model.sim_step()
+                    changed = np.argwhere(self.model.state_grid != self.previous)
+                    cells = [[int(x), int(y), STATE_TO_INT[self.model.state_grid[x, y]]] for x, y in changed]
+                    self.previous[tuple(changed.T)] = self.model.state_grid[tuple(changed.T)]
+                    self.publish("delta", {
+                        "step": self.model.t,
+                        "cells": cells,
+                        "tractors": self.tractor_positions()
+                    })
+                time.sleep(self.interval)
+
+        except Exception as e:
+            # A failed step ends the run; clients get the error before the end event
+            with self.lock:
+                self.error = str(e)
+                self.publish("error", {"error": self.error})
+
+        finally:
+            with self.lock:
+                self.finished = True
+                self.publish("end", {"step": self.model.t})
+                self.subscribers.clear()
+
+            # Keep the finished run for late clients for a while, then release the model
+            evict = threading.Timer(FINISHED_TTL, simulations.pop, args=(self.id, None))
+            evict.daemon = True
+            evict.start()
+
+
+@app.route('/simulations', methods=['POST'])
+def start_simulation():
+    try:
+        # Optional JSON body: {"parameters": {...}, "stepsPerSecond": 5}
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "The JSON body must be an object"}), 400
+
+        overrides = data.get("parameters", {})
+        if not isinstance(overrides, dict):
+            return jsonify({"error": "'parameters' must be an object"}), 400
+
+        steps_per_second = data.get("stepsPerSecond", 5)
+        if isinstance(steps_per_second, bool) or not isinstance(steps_per_second, (int, float)) \
+                or steps_per_second < 0:
+            return jsonify({"error": "'stepsPerSecond' must be a non-negative number"}), 400
+
+        error = validate_parameters(overrides)
+        if error is not None:
+            return jsonify({"error": error}), 400
+
+        parameters = dict(LIVE_PARAMETERS, **overrides)
+        with simulations_lock:
+            running = sum(not simulation.finished for simulation in simulations.values())
+            if running >= MAX_RUNNING_SIMULATIONS:
+                return jsonify({"error": "Too many simulations running, try again later"}), 429
+
+            simulation_id = str(uuid.uuid4())
+            simulation = LiveSimulation(simulation_id, parameters, float(steps_per_second))
+            simulation.start()
+            simulations[simulation_id] = simulation
+
+        return jsonify({"id": simulation_id, "stream": f"/simulations/{simulation_id}/stream"}), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/simulations/<simulation_id>/stream', methods=['GET'])
+def stream_simulation(simulation_id):
+    simulation = simulations.get(simulation_id)
+    if simulation is None:
+        return jsonify({"error": "Simulation not found"}), 404
+
+    events = simulation.subscribe()
+
+    def generate():
+        # Server-Sent Events: one keyframe, then deltas until the run ends. The queue
+        # is removed when the client disconnects so the worker stops filling it
+        try:
+            while True:
+                event, data = events.get()
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                if event == "end":
+                    break
+        finally:
+            simulation.unsubscribe(events)
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
+
 def save_combined_graphs(tractor_names, speeds_data, fuel_data, position_data, unique_id):
     # Create the output directory if it does not exist
     output_dir = "tractor_graphs"
@@ -0,0 +1,20 @@
+# Parámetros por defecto de la simulación, compartidos por simulation.py, train.py y la API
+DEFAULT_PARAMETERS = {
+    'field_size': 50,
+    'num_tractors': 3,
+    'capacity': 10,
+    'max_fuel': 100,
+    'fuel_consumption_rate': 1,
+    'fuel_threshold': 10,
+    'speed': 1,
+    'harvest_amount': 1,
+    'initial_ready_fraction': 0.2,
+    'breakdown_chance': 0.005,
+    'repair_steps': 3,
+    'growth_chance': 0.01,
+    'wither_chance': 0.005,
+    'dispatcher': False,  # Asignación centralizada de parcelas por subasta
+    'planning_interval': 0,  # Cada cuántos pasos se reasigna a todos (0 = solo al terminar o con poco combustible)
+    'steps': 500,
+    'seed': 42
+}
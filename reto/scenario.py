@@ -0,0 +1,143 @@
+import hashlib
+import os
+import re
+import tempfile
+import zipfile
+import numpy as np
+
+# Versión del formato compilado; cambiarla invalida los archivos de caché existentes
+SCENE_VERSION = 1
+
+
+def scenario_files(directory):
+    """
+    Lista los archivos del escenario en orden estable.
+
+    Args:
+    - directory: Carpeta con InitialPositions.txt, TargetPositions.txt y Obstacle_N.txt.
+
+    Returns:
+    - Lista de nombres de archivo, con los obstáculos ordenados por su número N.
+    """
+    obstacles = [f for f in os.listdir(directory) if re.fullmatch(r"Obstacle_\d+\.txt", f)]
+    obstacles.sort(key=lambda f: int(f[len("Obstacle_"):-len(".txt")]))
+    return ["InitialPositions.txt", "TargetPositions.txt"] + obstacles
+
+
+def parse_rows(text):
+    """
+    Convierte un archivo de dos líneas separadas por comas (x's y y's) en un arreglo (2, n).
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    return np.array([[float(a) for a in line.split(',')] for line in lines[:2]])
+
+
+def compile_scene(contents):
+    """
+    Construye los arreglos del escenario y sus estructuras de aceleración espacial.
+
+    Args:
+    - contents: Diccionario {nombre de archivo: texto} con los archivos del escenario.
+
+    Returns:
+    - Diccionario de arreglos NumPy:
+      initial_positions (2, R) y targets (2, T), fila 0 = x y fila 1 = y;
+      obstacles (M, 2, 4), las x's y las y's de los 4 vértices de cada obstáculo;
+      bounds (M, 4), caja envolvente (xmin, xmax, ymin, ymax) de cada obstáculo;
+      edges (M, 4, 2, 2), segmentos (inicio, fin) de cada lado del polígono.
+    """
+    obstacle_names = [name for name in contents if name.startswith("Obstacle_")]
+    obstacles = np.array([parse_rows(contents[name]) for name in obstacle_names]).reshape(-1, 2, 4)
+
+    vertices = obstacles.transpose(0, 2, 1)  # (M, 4, 2)
+    edges = np.stack([vertices, np.roll(vertices, -1, axis=1)], axis=2)
+    bounds = np.stack([obstacles[:, 0].min(axis=1), obstacles[:, 0].max(axis=1),
+                       obstacles[:, 1].min(axis=1), obstacles[:, 1].max(axis=1)], axis=1)
+
+    return {
+        "initial_positions": parse_rows(contents["InitialPositions.txt"]),
+        "targets": parse_rows(contents["TargetPositions.txt"]),
+        "obstacles": obstacles,
+        "bounds": bounds,
+        "edges": edges,
+    }
+
+
+def load_scenario(directory, cache_dir=None):
+    """
+    Carga un escenario completo (posiciones iniciales, objetivos y obstáculos) en una pasada.
+
+    El escenario compilado se guarda en un .npz cuyo nombre es el hash de los archivos,
+    así que las siguientes ejecuciones con los mismos archivos no vuelven a procesarlos.
+
+    Args:
+    - directory: Carpeta del escenario (por ejemplo reto/files).
+    - cache_dir: Carpeta de la caché; por defecto .scene_cache junto a directory.
+
+    Returns:
+    - Diccionario de arreglos NumPy descrito en compile_scene.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(directory)), ".scene_cache")
+
+    contents = {}
+    digest = hashlib.sha256(f"scene-v{SCENE_VERSION}".encode())
+    for name in scenario_files(directory):
+        with open(os.path.join(directory, name), 'rb') as file:
+            data = file.read()
+        digest.update(name.encode() + b"\0" + data + b"\0")
+        contents[name] = data.decode()
+
+    cache_file = os.path.join(cache_dir, f"{digest.hexdigest()}.npz")
+    if os.path.exists(cache_file):
+        try:
+            with np.load(cache_file) as cached:
+                return {key: cached[key] for key in cached.files}
+        except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+            pass  # Archivo de caché dañado: se vuelve a compilar
+
+    scene = compile_scene(contents)
+
+    # Escribir a un temporal en la misma carpeta y renombrarlo, para que otra ejecución
+    # que comparta la caché nunca lea un archivo a medio escribir
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temp_file = tempfile.mkstemp(suffix=".npz", dir=cache_dir)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            np.savez(file, **scene)
+        os.replace(temp_file, cache_file)
+    except BaseException:
+        os.remove(temp_file)
+        raise
+    return scene
+
+
+def points_in_obstacles(scene, points):
+    """
+    Indica qué puntos caen dentro de algún obstáculo.
+
+    Las cajas envolventes descartan primero los pares punto-obstáculo lejanos y solo los
+    restantes se prueban contra los lados del polígono (ray casting).
+
+    Args:
+    - scene: Escenario devuelto por load_scenario.
+    - points: Arreglo (P, 2) de coordenadas (x, y).
+
+    Returns:
+    - Arreglo booleano (P,).
+    """
+    points = np.atleast_2d(points)
+    px, py = points[:, 0, None], points[:, 1, None]
+    b = scene["bounds"]
+    candidates = (b[:, 0] <= px) & (px <= b[:, 1]) & (b[:, 2] <= py) & (py <= b[:, 3])
+
+    inside = np.zeros(len(points), dtype=bool)
+    for p, m in zip(*np.nonzero(candidates)):
+        start, end = scene["edges"][m, :, 0], scene["edges"][m, :, 1]
+        x, y = points[p]
+        crosses = (start[:, 1] > y) != (end[:, 1] > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = start[:, 0] + (y - start[:, 1]) * (end[:, 0] - start[:, 0]) / (end[:, 1] - start[:, 1])
+        if np.count_nonzero(crosses & (x < x_cross)) % 2 == 1:
+            inside[p] = True
+    return inside
@@ -2,40 +2,21 @@ import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
 from matplotlib.animation import FuncAnimation, PillowWriter
 import numpy as np
+import os
+from scenario import load_scenario, points_in_obstacles
 
-def load_obstacles_from_file(filename, obstacles_list):
-    """
-    Carga obstáculos desde un archivo de texto y los agrega a la lista de obstáculos.
-    
-    Formato del archivo:
-    Cada línea contiene 4 valores separados por comas que representan las coordenadas (x1, x2, x3, x4)
-    y (y1, y2, y3, y4) de un obstáculo.
-
-    Ejemplo:
-    0.44, -0.08, 0.21, 0.74
-    0.60, 0.30, -0.22, 0.07
-
-    Args:
-    - filename: Nombredel archivo a cargar.
-    - obstacles_list: Lista existente de obstáculos a la que se añadirán los nuevos.
-    """
-    try:
-        with open(filename, 'r') as file:
-            x =  [float(a)  for a in file.readline().split(',')]
-            y =  [float(a) for a in file.readline().split(',')]
-            obstacles_list.append([[x[0],x[1],x[2],x[3]],[y[0],y[1],y[2],y[3]]]) #y
-    except Exception as e:
-        print(f"Error al cargar el archivo: {e}")
+# Imprimir la geometría de obstáculos y objetivos (para depuración)
+print_geometry = False
 
 
-#Targets
+# Cargar el escenario (posiciones iniciales, objetivos y obstáculos) desde reto/files
+scene = load_scenario(os.path.join(os.path.dirname(os.path.abspath(__file__)), "files"))
 
-target_x = [-0.86717069892473,-0.277318548387096,0.286122311827957,-1.01683467741935,0.673487903225808,-1.37778897849462,1.54506048387097]
-target_y = [-0.356552419354838,0.550235215053764,-0.497412634408602,1.52745295698925,0.629469086021506,-1.36898521505376,-0.999227150537633]
+#Targets
+target_x, target_y = scene["targets"]
 
 # Cargar datos iniciales
-car_positions_x = [-3, 0]
-car_positions_y = [-1.5, -2]
+car_positions_x, car_positions_y = scene["initial_positions"].tolist()
 
 # Puntos de los caminos para ambos carros (puedes ajustar estos puntos según tus necesidades)
 car_paths = [
@@ -73,11 +54,8 @@ car_paths = [
      (target_x[5],target_y[5])]
 ]
 
-# Obstáculos (x1, x2, x3, x4) y (y1, y2, y3, y4)
-obstacles = []
-
-file_ob  = [f"Obstacle_{x}.txt" for x in range(1,7) ]
-[load_obstacles_from_file(x, obstacles) for x in file_ob ]
+# Obstáculos (x1, x2, x3, x4) y (y1, y2, y3, y4), arreglo (M, 2, 4)
+obstacles = scene["obstacles"]
 
 
 # Configuración de parámetros
@@ -101,16 +79,17 @@ ax.set_ylim(-2, 2)
 for i, obs in enumerate(obstacles):
     x, y = obs
     # Cerrar el polígono conectando el último punto con el primero
-    x_closed = x + [x[0]]
-    y_closed = y + [y[0]]
-
-    l = ["A",'B','C','D',"A","B"]
-    v = ["a","b","c","d","a"]
-    for j,(xx, yy) in enumerate(zip(x,y)):
-        print(f"{l[j]}{i}=({xx},{yy})")
-    print(f"tl{i} = Polígono(A{i}, B{i}, C{i}, D{i})")
-    for j in range(i):
-        print(f"{v[j]}{i} = Segmento({l[j]}, {l[j+1]}, tl{i})")
+    x_closed = np.append(x, x[0])
+    y_closed = np.append(y, y[0])
+
+    if print_geometry:
+        l = ["A",'B','C','D',"A","B"]
+        v = ["a","b","c","d","a"]
+        for j,(xx, yy) in enumerate(zip(x,y)):
+            print(f"{l[j]}{i}=({xx},{yy})")
+        print(f"tl{i} = Polígono(A{i}, B{i}, C{i}, D{i})")
+        for j in range(i):
+            print(f"{v[j]}{i} = Segmento({l[j]}, {l[j+1]}, tl{i})")
     
     ax.plot(x_closed, y_closed, 'r-', linewidth=3, alpha=1)  # Líneas rojas
     
@@ -119,7 +98,8 @@ car_scatters = [ax.plot([], [], 'bo', markersize=8)[0] for _ in range(2)]
 
 #Objetivos de la animacion
 for i, (x,y) in enumerate(zip(target_x, target_y)):
-    print(f"OBJ{i} = ({x},{y})")
+    if print_geometry:
+        print(f"OBJ{i} = ({x},{y})")
     ax.plot(x, y, 'go', markersize=6)
     ax.text(x -0.1,y + 0.15,i, color= 'red', fontsize= 10)
 
@@ -166,11 +146,9 @@ def update(frame):
             car_positions_x[i] += direction[0] * car_speed
             car_positions_y[i] += direction[1] * car_speed
         
-        # Verificar colisiones
-        for obs in obstacles:
-            x, y = obs
-            if x[0] <= car_positions_x[i] <= x[2] and y[0] <= car_positions_y[i] <= y[2]:
-                stop_flags[i] = True
+        # Verificar colisiones con los obstáculos (cajas envolventes y polígonos del escenario)
+        if points_in_obstacles(scene, [(car_positions_x[i], car_positions_y[i])])[0]:
+            stop_flags[i] = True
         
         for j in range(2):  # Checar colisión con el otro carro
             if i != j and distance((car_positions_x[i], car_positions_y[i]), 
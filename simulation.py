@@ -6,25 +6,10 @@ import matplotlib.colors as mcolors
 
 import random
 from HarvestModel import HarvestModel
+from default_parameters import DEFAULT_PARAMETERS
 
-# Definir los parámetros
-parameters = {
-    'field_size': 50,
-    'num_tractors': 3,
-    'capacity': 10,
-    'max_fuel': 100,
-    'fuel_consumption_rate': 1,
-    'fuel_threshold': 10,
-    'speed': 1,
-    'harvest_amount': 1,
-    'initial_ready_fraction': 0.2,
-    'breakdown_chance': 0.005,
-    'repair_steps': 3,
-    'growth_chance': 0.01,
-    'wither_chance': 0.005,
-    'steps': 500,
-    'seed': 42
-}
+# Definir los parámetros (ver default_parameters.py)
+parameters = dict(DEFAULT_PARAMETERS)
 model = HarvestModel(parameters)
 #model.run()  # Descomentar esto para generar graficas
 
@@ -93,6 +78,9 @@ animation = ap.animate(model, fig, ax, plot_field)
 # Save the animation as an MP4 file with a duration that reflects the number of frames
 animation.save("harvest_simulation.mp4", writer="ffmpeg", fps=5)  # Adjust fps as needed for smoother video
 
+# Exportar las trayectorias (paso, posición, combustible, carga, acción, recompensa)
+model.export_trajectories("harvest_trajectories.npy")
+
 # Aprender y guardar las tablas Q para la siguiente interacion
 model.save_q_tables()
 
@@ -0,0 +1,23 @@
+# Entrenamiento sin salida de las tablas Q de los tractores
+from HarvestModel import HarvestModel
+from VectorHarvestEnv import VectorHarvestEnv
+from default_parameters import DEFAULT_PARAMETERS
+
+# Definir los parámetros (mismos que simulation.py, sin registros ni gráficas)
+parameters = dict(DEFAULT_PARAMETERS, verbose=False, plot=False)
+
+episodes = 1000
+checkpoint_every = 100  # Guardar las tablas Q cada N episodios
+
+num_envs = 0  # Mayor que 0 para entrenar con K campos en paralelo (VectorHarvestEnv)
+
+if num_envs > 0:
+    # Continúa desde las mismas tablas Q que HarvestModel.train
+    env = VectorHarvestEnv(parameters, num_envs, shared_q=True)
+    env.load_q_tables()
+    harvested = env.train(episodes, checkpoint_every=checkpoint_every)
+else:
+    model = HarvestModel(parameters)
+    harvested = model.train(episodes, checkpoint_every=checkpoint_every)
+
+print(f"Episodios: {episodes}, promedio de parcelas cosechadas: {sum(harvested) / len(harvested):.1f}")